@@ -29,6 +29,14 @@ class Adapter(ABC):
         pass
 
 class StateAdapter(Adapter):  
+    # Optional PositionCache shared between worker processes, see set_position_cache()
+    position_cache = None
+
+    @staticmethod
+    def set_position_cache(position_cache) -> None:
+        """Share board_to_lang decodes across processes through a PositionCache."""
+        StateAdapter.position_cache = position_cache
+        StateAdapter.board_to_lang.cache_clear()
     
     @staticmethod
     def chess_object_lst() -> List[str]:
@@ -169,6 +177,13 @@ class StateAdapter(Adapter):
     def board_to_lang(board_fen: str):
         """ Output board us as a 2-d DataFrame with each board position and 
         the associated descriptive chess piece where . is still used to denote empty spaces. """
+        if StateAdapter.position_cache is not None:
+            cache_key = "board_to_lang:" + board_fen
+            board_df_src = StateAdapter.position_cache.get(cache_key)
+            if board_df_src is not None:
+                return board_df_src
+        else:
+            cache_key = None
         # Board from engine needs to be flipped for White's POV
         board_flip = Board(board_fen)
         board_flip.apply_transform(chess.flip_vertical)
@@ -194,6 +209,8 @@ class StateAdapter(Adapter):
                 else:
                     row = {"board_pos": board_pos, "player_name":'.' , "piece_id":'.', "piece_des_name": '.'}
                 board_df_src.append(row)
+        if cache_key is not None:
+            StateAdapter.position_cache.set(cache_key, board_df_src)
         return board_df_src
 
     @staticmethod
@@ -10,6 +10,8 @@ from gymnasium.spaces import Box
 
 # StateAdapter includes static methods for adapters
 from elsciRL.encoders.sentence_transformer_MiniLM_L6v2 import LanguageEncoder
+# Optional position cache shared between worker processes
+from adapters.position_cache import PositionCache
 
 class Adapter:
     _cached_state_idx: Dict[str, int] = dict()
@@ -27,6 +29,12 @@ class Adapter:
                 'e':"Black King's Pawn", 'f':"Black King Bishop's Pawn", 'g':"Black King Knight's Pawn",'h':"Black King Rook's Pawn"}}
          
         self.observation_space = Box(low=-1, high=1, shape=(1,384), dtype=np.float32)
+
+        # Optional shared cache of sentence encodings, e.g. {"slots": 4096, "slot_size": 65536}
+        if "position_cache" in setup_info:
+            self.position_cache = PositionCache(**setup_info["position_cache"])
+        else:
+            self.position_cache = None
     
     def adapter(self, state:str, legal_moves:list = None, episode_action_history:list = None, encode:bool = True, indexed: bool = False) -> Tensor:
         """ Use Language name for every ACTIVE piece name for current board position."""
@@ -54,7 +62,14 @@ class Adapter:
             
         # Encode to Tensor for agents
         if encode:
-            state_encoded = self.encoder.encode(state=state)
+            state_encoded = None
+            if self.position_cache is not None:
+                cache_key = "language_active_pieces:" + str(state)
+                state_encoded = self.position_cache.get(cache_key)
+            if state_encoded is None:
+                state_encoded = self.encoder.encode(state=state)
+                if self.position_cache is not None:
+                    self.position_cache.set(cache_key, state_encoded)
         else:
             state_encoded = state
 
@@ -68,7 +83,47 @@ class Adapter:
             state_encoded = torch.tensor(state_indexed)
 
         return state_encoded
-    
+
+    @staticmethod
+    def encoder_sentences(state) -> List[str]:
+        """Sentences the LanguageEncoder encodes for a state, one output row each.
+        Matches the encoder which splits a string state on '.' into separate sentences."""
+        if isinstance(state, str):
+            return [s for s in state.split(".") if s.strip()]
+        elif len(state) == 0:
+            return [""]
+        return list(state)
+
+    @staticmethod
+    def batch_adapter(adapters:list, states:list, legal_moves:list, episode_action_histories:list, encode:bool = True, indexed: bool = False) -> List[Tensor]:
+        """ Adapt the states of many environments, one adapter per environment.
+        All pending sentences are encoded in a single encoder call and returned in order."""
+        # Language states update each adapter's active pieces so must still be built per environment
+        lang_states = [adapter.adapter(state, moves, history, encode=False, indexed=indexed)
+                       for adapter, state, moves, history in zip(adapters, states, legal_moves, episode_action_histories)]
+        if (not encode) or indexed:
+            return lang_states
+
+        states_encoded = [None]*len(adapters)
+        pending: List[int] = []
+        for i, (adapter, state) in enumerate(zip(adapters, lang_states)):
+            if adapter.position_cache is not None:
+                states_encoded[i] = adapter.position_cache.get("language_active_pieces:" + str(state))
+            if states_encoded[i] is None:
+                pending.append(i)
+
+        if len(pending) > 0:
+            # Encoder returns one row per sentence so batch can be split back to each environment
+            sentences = [Adapter.encoder_sentences(lang_states[i]) for i in pending]
+            encoded = adapters[pending[0]].encoder.encode(state=[sent for sent_lst in sentences for sent in sent_lst])
+            row = 0
+            for i, sent_lst in zip(pending, sentences):
+                states_encoded[i] = encoded[row:row+len(sent_lst)]
+                row += len(sent_lst)
+                if adapters[i].position_cache is not None:
+                    adapters[i].position_cache.set("language_active_pieces:" + str(lang_states[i]), states_encoded[i])
+        return states_encoded
+
     @staticmethod
     def sample():
         board = chess.Board(fen='rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2')
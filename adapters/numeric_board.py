@@ -8,6 +8,9 @@ from elsciRL.encoders.poss_state_encoded import StateEncoder
 import chess
 from chess import Board, SQUARES_180
 
+# Optional position cache shared between worker processes
+from adapters.position_cache import PositionCache
+
 class Adapter:
     _cached_state_idx: Dict[str, int] = dict()
     @staticmethod
@@ -28,13 +31,29 @@ class Adapter:
     
         # Initialise encoder based on all possible env states
         self.observation_space = 12
+
+        # Optional shared position cache, e.g. {"slots": 4096, "slot_size": 65536}
+        if "position_cache" in setup_info:
+            self.position_cache = PositionCache(**setup_info["position_cache"])
+        else:
+            self.position_cache = None
         
     def adapter(self, state:any, legal_moves:list = None, episode_action_history:list = None, encode:bool = True, indexed: bool = False) -> Tensor:
         """  """
+        if (self.position_cache is not None) and isinstance(state, str):
+            cache_key = "numeric_board:" + state.split(" ")[0]
+            state_encoded = self.position_cache.get(cache_key)
+            if state_encoded is not None:
+                return state_encoded
+        else:
+            cache_key = None
+
         board = chess.Board(state)
         board_flip = board.copy(stack=False)
         board_flip.apply_transform(chess.flip_vertical)
         state = self.compact_lst(board_flip)
 
         state_encoded = state#torch.tensor(state)
+        if cache_key is not None:
+            self.position_cache.set(cache_key, state_encoded)
         return state_encoded
\ No newline at end of file
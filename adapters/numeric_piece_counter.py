@@ -9,6 +9,8 @@ from chess import Board, SQUARES_180
 
 # Link to relevant ENCODER
 from elsciRL.encoders.observable_objects_encoded import ObjectEncoder
+# Optional position cache shared between worker processes
+from adapters.position_cache import PositionCache
 
 class Adapter: 
     @staticmethod
@@ -35,11 +37,25 @@ class Adapter:
         
         # Define observation space
         self.observation_space = Discrete(12)
+        
+        # Optional shared position cache, e.g. {"slots": 4096, "slot_size": 65536}
+        if "position_cache" in setup_info:
+            self.position_cache = PositionCache(**setup_info["position_cache"])
+        else:
+            self.position_cache = None
 
     def adapter(self, state: str, legal_moves:list = None, episode_action_history:list = None, encode:bool=True, indexed: bool = False) -> Tensor:     
         """ Pieces on board are counted to define state.
         12 piece types define the observation space."""
 
+        if (self.position_cache is not None) and isinstance(state, str):
+            cache_key = "numeric_piece_counter:%s:%s:%s" % (encode, indexed, state.split(" ")[0])
+            state_encoded = self.position_cache.get(cache_key)
+            if state_encoded is not None:
+                return state_encoded
+        else:
+            cache_key = None
+        
         # Transform state
         board = chess.Board(state)
         board_flip = board.copy(stack=False)
@@ -53,6 +69,8 @@ class Adapter:
         if (indexed):
             state_encoded = torch.tensor([self.local_objects.get(obj, len(self.local_objects)) for obj in state])
         
+        if cache_key is not None:
+            self.position_cache.set(cache_key, state_encoded)
         return state_encoded
     
     def sample():
@@ -0,0 +1,141 @@
+import os
+import mmap
+import zlib
+import json
+import struct
+import hashlib
+from typing import Dict
+
+import numpy as np
+import torch
+
+
+class PositionCache:
+    """Position keyed cache of adapter outputs shared between processes on the same host.
+    Stored as a fixed size memory-mapped hash table so it is bounded, entries are evicted by
+    overwriting when two keys map to the same slot. Torn reads from concurrent writers fail
+    the checksum and are treated as a miss.
+    Values are stored as raw tensor data or JSON rather than pickled so reading the cache can
+    never run code."""
+    MAGIC = b"CHESSPC2"
+    # magic, number of slots, slot size
+    FILE_HEADER = struct.Struct("<8sII")
+    # key digest, payload length, checksum
+    SLOT_HEADER = struct.Struct("<QII")
+    # tensor metadata length
+    TENSOR_HEADER = struct.Struct("<I")
+    # Default cache location is private to the current user
+    DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "elsciRL_chess")
+
+    def __init__(self, path:str = None, slots:int = 4096, slot_size:int = 65536) -> None:
+        """Default slot size fits a MiniLM encoding of all 32 active pieces (32 x 384 float32).
+        The file is sparse so memory is only used for the slots that are filled."""
+        if path is None:
+            os.makedirs(self.DEFAULT_DIR, mode=0o700, exist_ok=True)
+            path = os.path.join(self.DEFAULT_DIR, "position_cache")
+        if slot_size <= self.SLOT_HEADER.size:
+            raise ValueError("slot_size must be larger than the slot header (%d bytes)" % self.SLOT_HEADER.size)
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.payload_size = slot_size - self.SLOT_HEADER.size
+        file_size = self.FILE_HEADER.size + slots*slot_size
+        # Created readable by the current user only, never truncates entries written by another process
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            existing_size = os.fstat(fd).st_size
+            if existing_size == 0:
+                os.ftruncate(fd, file_size)
+            elif existing_size != file_size:
+                raise ValueError("Position cache at %s was created with a different layout" % path)
+            self.mmap = mmap.mmap(fd, file_size)
+        finally:
+            os.close(fd)
+        magic, file_slots, file_slot_size = self.FILE_HEADER.unpack_from(self.mmap, 0)
+        if magic == bytes(len(self.MAGIC)):
+            self.FILE_HEADER.pack_into(self.mmap, 0, self.MAGIC, slots, slot_size)
+        elif (magic, file_slots, file_slot_size) != (self.MAGIC, slots, slot_size):
+            self.mmap.close()
+            raise ValueError("Position cache at %s was created with a different layout" % path)
+        # Stats are local to this process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.failed_stores = 0
+
+    @staticmethod
+    def key_digest(key:str) -> int:
+        # Python's hash() is salted per process so a stable digest is required
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+    @staticmethod
+    def serialize(value:any) -> bytes:
+        """Tensors are stored as their raw data with dtype and shape, anything else as JSON."""
+        if isinstance(value, torch.Tensor):
+            # Copies only this tensor's data, not the full storage a view may belong to
+            array = value.detach().cpu().numpy()
+            meta = json.dumps({"dtype": array.dtype.str, "shape": array.shape, "device": str(value.device)}).encode("utf-8")
+            return b"T" + PositionCache.TENSOR_HEADER.pack(len(meta)) + meta + array.tobytes()
+        return b"J" + json.dumps(value).encode("utf-8")
+
+    @staticmethod
+    def deserialize(payload:bytes) -> any:
+        if payload[:1] == b"T":
+            meta_start = 1 + PositionCache.TENSOR_HEADER.size
+            (meta_length,) = PositionCache.TENSOR_HEADER.unpack_from(payload, 1)
+            meta = json.loads(payload[meta_start:meta_start+meta_length])
+            array = np.frombuffer(payload, dtype=np.dtype(meta["dtype"]), offset=meta_start+meta_length)
+            return torch.from_numpy(array.reshape(meta["shape"]).copy()).to(meta["device"])
+        return json.loads(payload[1:])
+
+    def slot_offset(self, digest:int) -> int:
+        return self.FILE_HEADER.size + (digest % self.slots)*self.slot_size
+
+    def get(self, key:str, default:any = None) -> any:
+        digest = self.key_digest(key)
+        offset = self.slot_offset(digest)
+        slot_digest, length, checksum = self.SLOT_HEADER.unpack_from(self.mmap, offset)
+        if (slot_digest == digest) and (0 < length <= self.payload_size):
+            start = offset + self.SLOT_HEADER.size
+            payload = self.mmap[start:start+length]
+            if zlib.crc32(payload, digest & 0xFFFFFFFF) == checksum:
+                self.hits += 1
+                return self.deserialize(payload)
+        self.misses += 1
+        return default
+
+    def set(self, key:str, value:any) -> bool:
+        """Store value for key, returns False if the value can not be stored or does not fit in a slot."""
+        try:
+            payload = self.serialize(value)
+        except (TypeError, ValueError):
+            self.failed_stores += 1
+            return False
+        if len(payload) > self.payload_size:
+            self.failed_stores += 1
+            return False
+        digest = self.key_digest(key)
+        offset = self.slot_offset(digest)
+        slot_digest, length, _ = self.SLOT_HEADER.unpack_from(self.mmap, offset)
+        if (length > 0) and (slot_digest != digest):
+            self.evictions += 1
+        # Invalidate the slot before writing so readers never accept a partial payload
+        self.SLOT_HEADER.pack_into(self.mmap, offset, 0, 0, 0)
+        start = offset + self.SLOT_HEADER.size
+        self.mmap[start:start+len(payload)] = payload
+        self.SLOT_HEADER.pack_into(self.mmap, offset, digest, len(payload), zlib.crc32(payload, digest & 0xFFFFFFFF))
+        return True
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "failed_stores": self.failed_stores,
+                "hit_rate": self.hits/lookups if lookups > 0 else 0.0}
+
+    def clear(self) -> None:
+        """Empty the table for all processes using it."""
+        for slot in range(self.slots):
+            self.SLOT_HEADER.pack_into(self.mmap, self.FILE_HEADER.size + slot*self.slot_size, 0, 0, 0)
+
+    def close(self) -> None:
+        self.mmap.close()
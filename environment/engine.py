@@ -1,8 +1,13 @@
 # Engine used to obtain move scores
 import chess.engine
+import chess.polyglot
 from chess import Board
 import numpy as np
 
+# Polyglot Zobrist keys used for the fast termination check repetition table
+ZOBRIST_ARRAY = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+ZOBRIST_HASHER = chess.polyglot.ZobristHasher(ZOBRIST_ARRAY)
+
 # Opponent agent imports
 from elsciRL.agents.random_agent import RandomAgent
 
@@ -27,6 +32,27 @@ class Engine:
             self.custom_termination = local_setup_info["custom_termination"]
         else:
             self.custom_termination = None
+        # Termination check mode: "full" uses board.is_game_over() which replays the move stack
+        # for repetition, "fast" keeps a running Zobrist repetition table and caches the outcome per ply
+        if "termination_check" in local_setup_info:
+            self.termination_check = local_setup_info["termination_check"]
+        else:
+            self.termination_check = "full"
+        # - Fast mode only, skip the 75-move rule and insufficient material checks (e.g. for training)
+        if "skip_rare_termination_checks" in local_setup_info:
+            self.skip_rare_termination_checks = local_setup_info["skip_rare_termination_checks"]
+        else:
+            self.skip_rare_termination_checks = False
+        # Self-play: the agent plays both colours and observations/actions are given from the
+        # side-to-move's perspective (board mirrored on Black's turn) so one policy serves both
+        if "self_play" in local_setup_info:
+            self.self_play = local_setup_info["self_play"]
+        else:
+            self.self_play = False
+        # - Actions in the episode history are mirrored on Black's turn, only board based adapters
+        #   (numeric_board, numeric_piece_counter) read the mirrored observation correctly
+        if self.self_play and ("language_active_pieces" in local_setup_info.get("adapter_select", [])):
+            raise ValueError("self_play is not supported with the language_active_pieces adapter, use a numeric adapter")
         # Ledger of the environment with meta information for the problem
         ledger_required = {
             'id': 'Unique Problem ID',
@@ -52,6 +78,11 @@ class Engine:
         self.ledger = ledger_required | ledger_optional | ledger_gym_compatibility
         # --- CHESS ENGINE SETUP ---
         self.board: Board = chess.Board()
+        self.zobrist_key: int = 0
+        self.repetition_table: dict = {}
+        self.last_result: str = "*"
+        self.terminated: bool = False
+        self.reset_termination_cache()
         if local_setup_info["action_cap"]:
             self.action_cap = local_setup_info["action_cap"]
         else:
@@ -76,9 +107,95 @@ class Engine:
         self.training_opponent = OPPONENT_AGENT_TYPES[opponent_agent](**opponent_agent_parameters) 
         # ---
 
-    def reward_signal_function(self, obs:any):
-        board = chess.Board(obs)
-        game_result = board.result()
+    def reset_termination_cache(self):
+        """Reset the Zobrist repetition table and cached outcome to the current board."""
+        self.zobrist_key = ZOBRIST_HASHER(self.board)
+        self.repetition_table = {self.zobrist_key: 1}
+        self.last_result = "*"
+
+    def update_zobrist_key(self, move:chess.Move):
+        """Push the move and update the Zobrist key from only the squares it changes."""
+        board = self.board
+        from_square, to_square = move.from_square, move.to_square
+        if board.is_castling(move):
+            # King and rook both move along the back rank
+            rank = chess.square_rank(from_square)
+            squares = [chess.square(file, rank) for file in range(8)]
+        elif board.is_en_passant(move):
+            squares = [from_square, to_square, chess.square(chess.square_file(to_square), chess.square_rank(from_square))]
+        else:
+            squares = [from_square, to_square]
+        pieces_before = [board.piece_at(sq) for sq in squares]
+        key = self.zobrist_key ^ ZOBRIST_HASHER.hash_castling(board) ^ ZOBRIST_HASHER.hash_ep_square(board)
+
+        board.push(move)
+        for sq, piece_before in zip(squares, pieces_before):
+            piece_after = board.piece_at(sq)
+            if piece_before != piece_after:
+                if piece_before:
+                    key ^= ZOBRIST_ARRAY[64*((piece_before.piece_type-1)*2 + piece_before.color) + sq]
+                if piece_after:
+                    key ^= ZOBRIST_ARRAY[64*((piece_after.piece_type-1)*2 + piece_after.color) + sq]
+        # Turn always changes
+        key ^= ZOBRIST_HASHER.hash_castling(board) ^ ZOBRIST_HASHER.hash_ep_square(board) ^ ZOBRIST_ARRAY[780]
+        self.zobrist_key = key
+
+    def fast_outcome(self, key:int):
+        """Game over check that does not replay the move stack.
+        Repetitions are counted from the running Zobrist table so the cost does not grow with game length."""
+        board = self.board
+        if not any(board.generate_legal_moves()):
+            if board.is_check():
+                return chess.Outcome(chess.Termination.CHECKMATE, not board.turn)
+            return chess.Outcome(chess.Termination.STALEMATE, None)
+        if not self.skip_rare_termination_checks:
+            if board.is_insufficient_material():
+                return chess.Outcome(chess.Termination.INSUFFICIENT_MATERIAL, None)
+            if board.halfmove_clock >= 150:
+                return chess.Outcome(chess.Termination.SEVENTYFIVE_MOVES, None)
+        if self.repetition_table[key] >= 5:
+            return chess.Outcome(chess.Termination.FIVEFOLD_REPETITION, None)
+        return None
+
+    def push_move(self, action:any):
+        """Apply a UCI move to the board and return whether the game is over."""
+        if self.termination_check == "fast":
+            move = chess.Move.from_uci(action)
+            if not self.board.is_legal(move):
+                raise chess.IllegalMoveError(f"illegal move: {action} in {self.board.fen()}")
+            self.update_zobrist_key(move)
+            # Positions before a capture or pawn move can not repeat
+            if self.board.halfmove_clock == 0:
+                self.repetition_table.clear()
+            key = self.zobrist_key
+            self.repetition_table[key] = self.repetition_table.get(key, 0) + 1
+            outcome = self.fast_outcome(key)
+            # Keep result of the latest ply so the reward signal does not need to recompute it
+            self.last_result = outcome.result() if outcome else "*"
+            return outcome is not None
+        self.board.push_san(self.board.san(chess.Move.from_uci(action)))
+        return self.board.is_game_over()
+
+    @staticmethod
+    def canonical_move(action:any):
+        """Mirror a UCI move between the real and side-to-move board orientation."""
+        move = chess.Move.from_uci(action)
+        return chess.Move(chess.square_mirror(move.from_square), chess.square_mirror(move.to_square), move.promotion).uci()
+
+    def canonical_obs(self):
+        """Board FEN from the side-to-move's perspective, Black's turn is mirrored to White."""
+        if self.board.turn == chess.WHITE:
+            return self.board.fen()
+        return self.board.mirror().fen()
+
+    def reward_signal_function(self, obs:any, mover:bool=chess.WHITE, game_result:str=None):
+        # Fast termination check passes the result it already found for the ply
+        if game_result is None:
+            board = chess.Board(obs)
+            game_result = board.result()
+        # Reward is given from the perspective of the player that moved
+        if mover == chess.BLACK:
+            game_result = {"1-0": "0-1", "0-1": "1-0"}.get(game_result, game_result)
         if self.reward_signal:
             # Custom reward signal from env config
             # Win
@@ -110,11 +227,8 @@ class Engine:
         return reward
 
 
-    def white_move(self, action:any):
-        self.board.push_san(self.board.san(chess.Move.from_uci(action)))        
-        obs = self.board.fen()
+    def custom_termination_check(self, terminated:bool):
         board = self.board
-        terminated = self.board.is_game_over()
         if self.custom_termination:
             if not terminated:
                 # Custom termination on first capture
@@ -122,8 +236,34 @@ class Engine:
                     # - Check if the number of pieces on the board is less than 74
                     if np.sum([board.piece_type_at(sq) for sq in chess.SQUARES if board.piece_type_at(sq) is not None])<74:
                         terminated = True
+        return terminated
+
+    def white_move(self, action:any):
+        terminated = self.push_move(action)
+        obs = self.board.fen()
+        terminated = self.custom_termination_check(terminated)
         
         return obs, terminated
+
+    def self_play_move(self, action:any):
+        """Side-to-move plays the action given in its own orientation.
+        Only the mover can end the game, so the opponent's reward for the result is also given in info
+        for the opponent's last transition."""
+        mover = self.board.turn
+        if mover == chess.BLACK:
+            action = self.canonical_move(action)
+        terminated = self.push_move(action)
+        terminated = self.custom_termination_check(terminated)
+        self.terminated = terminated
+        obs_fen = self.board.fen()
+        # Result is found once and scored for both players
+        game_result = self.last_result if self.termination_check == "fast" else chess.Board(obs_fen).result()
+        reward = self.reward_signal_function(obs_fen, mover, game_result)
+        opponent_reward = self.reward_signal_function(obs_fen, not mover, game_result)
+        # Next observation is for the opponent, who is now the side-to-move
+        obs = self.canonical_obs()
+        info = {"mover": "White" if mover == chess.WHITE else "Black", "opponent_reward": opponent_reward}
+        return obs, reward, terminated, info
     
 
     def black_move(self):
@@ -132,23 +272,28 @@ class Engine:
         legal_moves = self.legal_move_generator(obs)
         if len(legal_moves) > 0:
             action = self.training_opponent.policy(obs, legal_moves)
-            self.board.push_san(self.board.san(chess.Move.from_uci(action)))
-            terminated = self.board.is_game_over()
+            terminated = self.push_move(action)
 
         return terminated
 
     def reset(self, start_obs:any=None):
         """Fully reset the environment."""
         self.board.reset()
+        self.reset_termination_cache()
+        self.terminated = False
         obs = self.board.fen()
         return obs
 
     def step(self, state:any, action:any):
         """Enact an action."""
+        if self.self_play:
+            # Each action completes a single move for the side-to-move
+            return self.self_play_move(action)
         # Each action completes a white move then a black move
         # White move
         obs, terminated = self.white_move(action)
         # Chess engine does not provide a reward signal by itself
+        game_result = self.last_result if self.termination_check == "fast" else None
 
         # Black move
         # - If the game is not over, the black agent will make a move
@@ -156,12 +301,35 @@ class Engine:
             terminated = self.black_move()
         
         # - Game may end on black move so need to apply this to white's last move
-        reward =  self.reward_signal_function(obs)
+        reward =  self.reward_signal_function(obs, game_result=game_result)
         return obs, reward, terminated, {}
 
+    @staticmethod
+    def batch_step(engines:list, states:list, batch_policy):
+        """Step many concurrent self-play games with a single policy call.
+        As each state is from its side-to-move's perspective, both colours' decisions share one batch.
+        batch_policy(states, legal_moves) must return one action per state, in order.
+        Games that have already terminated are skipped and return None until they are reset."""
+        for engine in engines:
+            if not engine.self_play:
+                raise ValueError("batch_step requires every engine to be setup with self_play")
+        active = [i for i, engine in enumerate(engines) if not engine.terminated]
+        results = [None]*len(engines)
+        if len(active) == 0:
+            return results
+        active_states = [states[i] for i in active]
+        legal_moves = [engines[i].legal_move_generator(states[i]) for i in active]
+        actions = batch_policy(active_states, legal_moves)
+        for i, action in zip(active, actions):
+            results[i] = engines[i].step(states[i], action)
+        return results
+
     def legal_move_generator(self, obs:any=None):
         """Define legal moves at each position"""
-        legal_moves = str(list(self.board.legal_moves)).replace(" Move.from_uci('","").replace("[Move.from_uci('","").replace("')","").replace("]","").split(",")
+        board = self.board
+        if self.self_play and board.turn == chess.BLACK:
+            board = board.mirror()
+        legal_moves = str(list(board.legal_moves)).replace(" Move.from_uci('","").replace("[Move.from_uci('","").replace("')","").replace("]","").split(",")
         legal_moves = legal_moves if (legal_moves != "[]") else [""]
         return legal_moves
 